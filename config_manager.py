@@ -1,7 +1,51 @@
 import os
 import json
+import logging
 import platform
 from datetime import datetime
+from types import MappingProxyType
+
+logger = logging.getLogger(__name__)
+
+# 优先使用 orjson（可选依赖），否则回退到标准库 json
+try:
+    import orjson
+    
+    def _dumps(obj):
+        return orjson.dumps(obj)
+    
+    _loads = orjson.loads
+except ImportError:
+    def _dumps(obj):
+        return json.dumps(obj, separators=(',', ':')).encode('utf-8')
+    
+    _loads = json.loads
+
+# 默认配置，只读且只创建一次
+_DEFAULT_CONFIG = MappingProxyType({
+    "language": "zh_tw",
+    "last_used_params": MappingProxyType({
+        "mode": "client",
+        "host": "localhost",
+        "port": 5201,
+        "time": 10,
+        "bandwidth": "0",
+        "parallel": 1,
+        "interval": 1.0,
+        "udp": False,
+        "reverse": False,
+        "format": "normal",
+        "extra_params": ""
+    }),
+    "auto_save_results": True
+})
+
+def _merge_with_defaults(config):
+    """合并默认配置和加载的配置，返回新的可修改字典"""
+    merged = {**_DEFAULT_CONFIG, **config}
+    merged["last_used_params"] = {**_DEFAULT_CONFIG["last_used_params"],
+                                  **config.get("last_used_params", {})}
+    return merged
 
 class ConfigManager:
     """配置管理器，处理配置文件的加载和保存"""
@@ -9,6 +53,9 @@ class ConfigManager:
     def __init__(self):
         self.config_dir = self.get_config_dir()
         self.config_file = os.path.join(self.config_dir, "iperf_gui_config.json")
+        self._results_dir_cached = None
+        self._date_dir_cached = None  # (日期字符串, 目录路径)
+        self._cached_config = None
         self.ensure_config_dir()
         
     def get_config_dir(self):
@@ -25,59 +72,47 @@ class ConfigManager:
     
     def ensure_config_dir(self):
         """确保配置目录存在"""
-        if not os.path.exists(self.config_dir):
-            os.makedirs(self.config_dir, exist_ok=True)
+        os.makedirs(self.config_dir, exist_ok=True)
     
     def get_results_dir(self):
         """获取结果文件保存目录"""
-        results_dir = os.path.join(self.config_dir, "results")
-        if not os.path.exists(results_dir):
+        if self._results_dir_cached is None:
+            results_dir = os.path.join(self.config_dir, "results")
             os.makedirs(results_dir, exist_ok=True)
-        return results_dir
+            self._results_dir_cached = results_dir
+        return self._results_dir_cached
     
     def load_config(self):
-        """加载配置文件"""
-        default_config = {
-            "language": "zh_tw",
-            "last_used_params": {
-                "mode": "client",
-                "host": "localhost",
-                "port": 5201,
-                "time": 10,
-                "bandwidth": "0",
-                "parallel": 1,
-                "interval": 1.0,
-                "udp": False,
-                "reverse": False,
-                "format": "normal",
-                "extra_params": ""
-            },
-            "auto_save_results": True
-        }
-        
+        """加载配置文件，只在第一次调用时读取磁盘，之后返回缓存"""
+        if self._cached_config is None:
+            self._cached_config = self._load_config_uncached()
+        return self._cached_config
+    
+    def _load_config_uncached(self):
+        """从磁盘读取配置文件并与默认配置合并"""
         if os.path.exists(self.config_file):
             try:
-                with open(self.config_file, 'r') as f:
-                    config = json.load(f)
-                    # 合并默认配置和加载的配置
-                    for key in default_config:
-                        if key not in config:
-                            config[key] = default_config[key]
-                    return config
-            except Exception as e:
-                print(f"Error loading config: {e}")
-                return default_config
-        else:
-            return default_config
+                with open(self.config_file, 'rb') as f:
+                    return _merge_with_defaults(_loads(f.read()))
+            except Exception:
+                logger.exception("Error loading config")
+        return _merge_with_defaults({})
     
     def save_config(self, config):
-        """保存配置文件"""
+        """保存配置文件
+
+        先写入临时文件再用 os.replace 原子替换，避免写到一半的配置文件。
+        刻意不调用 fsync：配置丢失最后一次修改可以接受，不值得为此等待磁盘。
+        """
+        self._cached_config = config
+        tmp_file = self.config_file + ".tmp"
         try:
-            with open(self.config_file, 'w') as f:
-                json.dump(config, f, indent=4)
+            with open(tmp_file, 'wb') as f:
+                f.write(_dumps(config))
+            os.replace(tmp_file, self.config_file)
             return True
-        except Exception as e:
-            print(f"Error saving config: {e}")
+        except Exception:
+            logger.exception("Error saving config")
             return False
     
     def get_timestamp(self):
@@ -86,18 +121,20 @@ class ConfigManager:
     
     def get_result_file_paths(self, test_type=""):
         """获取结果文件路径"""
-        timestamp = self.get_timestamp()
-        results_dir = self.get_results_dir()
+        # 日期目录和时间戳取自同一时刻，避免跨午夜时不一致
+        now = datetime.now()
+        timestamp = now.strftime("%Y%m%d_%H%M%S")
+        date_str = now.strftime("%Y%m%d")
         
-        # 创建以日期为名称的子目录
-        date_dir = os.path.join(results_dir, datetime.now().strftime("%Y%m%d"))
-        if not os.path.exists(date_dir):
+        # 创建以日期为名称的子目录，同一天内只创建一次
+        if self._date_dir_cached is None or self._date_dir_cached[0] != date_str:
+            date_dir = os.path.join(self.get_results_dir(), date_str)
             os.makedirs(date_dir, exist_ok=True)
+            self._date_dir_cached = (date_str, date_dir)
+        date_dir = self._date_dir_cached[1]
         
         prefix = f"iperf_{test_type}_" if test_type else "iperf_"
+        base = os.path.join(date_dir, f"{prefix}{timestamp}")
         
-        text_path = os.path.join(date_dir, f"{prefix}{timestamp}.txt")
-        json_path = os.path.join(date_dir, f"{prefix}{timestamp}.json")
-        graph_path = os.path.join(date_dir, f"{prefix}{timestamp}.png")
-        
-        return text_path, json_path, graph_path
\ No newline at end of file
+        text_path, json_path, graph_path = [f"{base}.{ext}" for ext in ("txt", "json", "png")]
+        return text_path, json_path, graph_path
@@ -1,11 +1,84 @@
-import pyqtgraph as pg
+import importlib.util
+import numpy as np
 from PyQt5.QtWidgets import QWidget, QVBoxLayout
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, QTimer, pyqtSignal
 from PyQt5.QtGui import QFont, QColor
 
+# pyqtgraph 導入較慢，在第一次創建圖表時才加載
+pg = None
+
+def _pg():
+    """加載 pyqtgraph 並應用全局繪圖設置，只執行一次"""
+    global pg
+    if pg is None:
+        import pyqtgraph
+        import pyqtgraph.exporters
+        
+        # 全局繪圖設置：白色背景；安裝了 PyOpenGL 時用 GPU 繪製曲線。
+        # 在創建第一個 PlotWidget 之前設置，頻寬和 ping 圖表都會使用 OpenGL；
+        # 實時刷新的曲線保持關閉抗鋸齒，每幀的繪製開銷要低得多
+        has_opengl = importlib.util.find_spec("OpenGL") is not None
+        pyqtgraph.setConfigOptions(background='w', foreground='k', antialias=False,
+                                   useOpenGL=has_opengl, enableExperimental=has_opengl)
+        pg = pyqtgraph
+    return pg
+
+# 坐標軸字體，所有圖表共用（QFont 需在 QApplication 創建後才能構造）
+_TICK_FONT = None
+
+def _tick_font():
+    """獲取共用的坐標軸字體"""
+    global _TICK_FONT
+    if _TICK_FONT is None:
+        _TICK_FONT = QFont()
+        _TICK_FONT.setPointSize(10)
+    return _TICK_FONT
+
+class NPRingBuffer:
+    """固定容量的 NumPy 環形緩衝區
+    
+    每個值同時寫入 i 和 i + capacity 兩個位置，最近的數據始終是底層數組中
+    的一段連續切片，取數據時不需要複製或 np.roll，數組地址也保持不變。
+    默認使用 float32：延遲和時間值的精度足夠，內存和統計計算的帶寬減半。
+    """
+    
+    def __init__(self, capacity, dtype=None):
+        self.capacity = capacity
+        self._buf = np.empty(capacity * 2, dtype=dtype or np.float32)
+        self._head = 0  # 下一個寫入位置
+        self._size = 0
+    
+    def __len__(self):
+        return self._size
+    
+    def append(self, value):
+        """追加一個值，已滿時覆蓋最舊的值"""
+        head = self._head
+        self._buf[head] = value
+        self._buf[head + self.capacity] = value
+        self._head = (head + 1) % self.capacity
+        if self._size < self.capacity:
+            self._size += 1
+    
+    def last(self):
+        """返回最近追加的值"""
+        return self._buf[self._head + self.capacity - 1]
+    
+    def unwrap(self):
+        """按追加順序返回所有數據的連續視圖（不複製）"""
+        end = self._head + self.capacity
+        return self._buf[end - self._size:end]
+    
+    def clear(self):
+        self._head = 0
+        self._size = 0
+
 class GraphView(QWidget):
     """用於顯示圖形數據的視圖"""
     
+    # 視圖重新顯示時發出（例如切換回所在的選項卡），隱藏期間跳過的重繪可以在此補上
+    shown = pyqtSignal()
+    
     def __init__(self, lang_resources, current_language):
         super().__init__()
         
@@ -15,6 +88,10 @@ class GraphView(QWidget):
         # 初始化UI
         self.init_ui()
     
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.shown.emit()
+    
     def set_language(self, lang_resources, current_language):
         """設置語言"""
         self.lang_resources = lang_resources
@@ -23,14 +100,12 @@ class GraphView(QWidget):
     
     def init_ui(self):
         """初始化UI"""
+        _pg()
+        
         # 創建佈局
         layout = QVBoxLayout(self)
         layout.setContentsMargins(0, 0, 0, 0)
         
-        # 設置白色背景
-        pg.setConfigOption('background', 'w')
-        pg.setConfigOption('foreground', 'k')
-        
         # 創建繪圖窗口
         self.plot_widget = pg.PlotWidget()
         
@@ -46,9 +121,13 @@ class GraphView(QWidget):
         # 設置網格
         self.plot_widget.showGrid(x=True, y=True, alpha=0.3)
         
+        # 數據點多於像素時自動降採樣（保留峰值），並只繪製可見範圍內的數據；
+        # 在圖表上設置一次，之後添加的所有曲線（包括 ping 曲線）都會沿用
+        self.plot_widget.setDownsampling(auto=True, mode='peak')
+        self.plot_widget.setClipToView(True)
+        
         # 設置字體
-        font = QFont()
-        font.setPointSize(10)
+        font = _tick_font()
         self.plot_widget.getAxis("bottom").tickFont = font
         self.plot_widget.getAxis("left").tickFont = font
         
@@ -58,43 +137,136 @@ class GraphView(QWidget):
         # 添加到佈局
         layout.addWidget(self.plot_widget)
         
-        # 初始化數據曲線
+        # 初始化數據曲線及按顏色緩存的筆
         self.curves = {}
+        self._pens = {}
+        self._dash_pens = {}
         
-        # 初始化文本項和線條列表
+        # 待刷新的曲線數據，由定時器以固定頻率統一調用 setData
+        self._pending = {}
+        self._flush_timer = QTimer(self)
+        self._flush_timer.setSingleShot(True)
+        self._flush_timer.setInterval(50)  # 最多每秒刷新 20 次
+        self._flush_timer.timeout.connect(self.flush)
+        
+        # update_graph 追加的系列只保留最近的數據點，使用環形緩衝區，值為 (x, y)
+        self._rings = {}
+        # 被 reset_data() 隱藏並移出圖例的曲線 key（與用戶點擊圖例隱藏的曲線區分）
+        self._reset_hidden = set()
+        
+        # 初始化文本項和線條列表，帶 key 的項另外按 key 保存以便重用
         self.text_items = []
         self.lines = []
+        self._text_by_key = {}
+        self._line_by_key = {}
     
-    def add_series(self, x_data, y_data, name="Data", color=(0, 0, 255)):
-        """添加數據系列到圖表"""
-        # 創建筆
-        pen = pg.mkPen(color=color, width=2)
+    def add_series(self, x_data, y_data, name="Data", color=(0, 0, 255), key=None):
+        """添加數據系列到圖表
+        
+        曲線按 key（默認為 name）保存，再次添加同一系列時只更新數據。
+        """
+        if key is None:
+            key = name
         
-        # 如果曲線已經存在，更新數據
-        if name in self.curves:
-            self.curves[name].setData(x_data, y_data)
+        # 如果曲線已經存在，記錄數據等待下次刷新
+        if key in self.curves:
+            self._pending[key] = (x_data, y_data)
+            if not self._flush_timer.isActive():
+                self._flush_timer.start()
         else:
-            # 創建新曲線
+            # 同一顏色的筆只創建一次
+            pen = self._pens.get(tuple(color))
+            if pen is None:
+                pen = self._pens[tuple(color)] = pg.mkPen(color=color, width=1)
+            
+            # 創建新曲線，像素級降採樣和可見範圍裁剪沿用圖表上的設置
             curve = self.plot_widget.plot(x_data, y_data, name=name, pen=pen)
-            self.curves[name] = curve
+            curve.setSkipFiniteCheck(True)
+            self.curves[key] = curve
     
-    def update_graph(self, y_data, x_data=None, name="Data", color=(0, 0, 255)):
-        """更新圖表數據"""
-        # 如果沒有提供 x 數據，則使用索引
-        if x_data is None:
-            x_data = list(range(len(y_data)))
+    def flush(self):
+        """把累積的數據更新一次性寫入曲線，每條曲線只調用一次 setData
+        
+        調用方已經自行限制了刷新頻率時，可以直接調用，不必等待定時器。
+        """
+        self._flush_timer.stop()
+        pending = self._pending
+        if not pending:
+            return
+        self._pending = {}
         
-        # 添加或更新數據系列
-        self.add_series(x_data, y_data, name=name, color=color)
+        # 所有曲線更新完之後才重繪一次
+        self.plot_widget.setUpdatesEnabled(False)
+        try:
+            for key, (x_data, y_data) in pending.items():
+                curve = self.curves.get(key)
+                if curve is not None:
+                    curve.setData(x_data, y_data)
+                    if key in self._reset_hidden:
+                        # reset_data() 隱藏曲線時移除了圖例項，重新顯示時加回
+                        self._reset_hidden.discard(key)
+                        curve.setVisible(True)
+                        self.legend.addItem(curve, curve.name())
+        finally:
+            self.plot_widget.setUpdatesEnabled(True)
+    
+    def update_graph(self, y_value, x_value=None, name="Data", color=(0, 0, 255), max_points=1000):
+        """追加一個數據點並更新圖表，只保留最近的 max_points 個數據點"""
+        rings = self._rings.get(name)
+        if rings is None:
+            rings = self._rings[name] = (NPRingBuffer(max_points), NPRingBuffer(max_points))
+        x_ring, y_ring = rings
+        
+        # 如果沒有提供 x 數據，則使用遞增的索引
+        if x_value is None:
+            x_value = x_ring.last() + 1 if len(x_ring) else 0
+        
+        x_ring.append(x_value)
+        y_ring.append(y_value)
+        self.add_series(x_ring.unwrap(), y_ring.unwrap(), name=name, color=color)
+    
+    def series_length(self, name="Data"):
+        """返回 update_graph 為該系列保存的數據點數"""
+        rings = self._rings.get(name)
+        return len(rings[0]) if rings is not None else 0
+    
+    def reset_data(self):
+        """清空所有數據但保留圖表項
+        
+        曲線設為空數據，文本項和線條只隱藏，之後再添加同一系列時直接重用，
+        不需要重新創建場景中的圖表項。
+        """
+        self._pending = {}
+        self._flush_timer.stop()
+        for x_ring, y_ring in self._rings.values():
+            x_ring.clear()
+            y_ring.clear()
+        
+        for key, curve in self.curves.items():
+            curve.setData([], [])
+            if key not in self._reset_hidden:
+                self._reset_hidden.add(key)
+                curve.setVisible(False)
+                self.legend.removeItem(curve)
+        for item in self.text_items:
+            item.setVisible(False)
+        for line in self.lines:
+            line.setVisible(False)
     
     def clear_graph(self, keep_settings=False):
         """清除圖表"""
         self.plot_widget.clear()
         self.curves = {}
+        self._pending = {}
+        self._flush_timer.stop()
+        self._rings = {}
+        self._reset_hidden = set()
         
         # 清除保存的文本項和線條引用
         self.text_items = []
         self.lines = []
+        self._text_by_key = {}
+        self._line_by_key = {}
         
         # 重新設置標題和軸標籤
         if keep_settings:
@@ -109,8 +281,18 @@ class GraphView(QWidget):
             # 重新添加圖例
             self.legend = self.plot_widget.addLegend()
     
-    def add_text_item(self, text, x, y, color=(0, 0, 0)):
-        """添加文本項到圖表"""
+    def add_text_item(self, text, x, y, color=(0, 0, 0), key=None):
+        """添加文本項到圖表
+        
+        提供 key 時，同一 key 的文本項只創建一次，之後只更新文本和位置。
+        """
+        text_item = self._text_by_key.get(key) if key is not None else None
+        if text_item is not None:
+            text_item.setText(text)
+            text_item.setPos(x, y)
+            text_item.setVisible(True)
+            return text_item
+        
         # 創建文本項
         text_item = pg.TextItem(text=text, color=color, anchor=(0, 0))
         text_item.setPos(x, y)
@@ -120,16 +302,32 @@ class GraphView(QWidget):
         
         # 保存引用以便後續清除
         self.text_items.append(text_item)
+        if key is not None:
+            self._text_by_key[key] = text_item
         
         return text_item
     
-    def add_horizontal_line(self, y_value, name="Average", color=(0, 0, 255, 100)):
-        """添加水平線到圖表"""
+    def add_horizontal_line(self, y_value, name="Average", color=(0, 0, 255, 100), key=None):
+        """添加水平線到圖表
+        
+        提供 key 時，同一 key 的水平線只創建一次，之後只移動位置。
+        """
+        line = self._line_by_key.get(key) if key is not None else None
+        if line is not None:
+            line.setValue(y_value)
+            line.setVisible(True)
+            return line
+        
+        # 同一顏色的虛線筆只創建一次
+        pen = self._dash_pens.get(tuple(color))
+        if pen is None:
+            pen = self._dash_pens[tuple(color)] = pg.mkPen(color=color, width=1, style=Qt.DashLine)
+        
         # 創建水平線
         line = pg.InfiniteLine(
             pos=y_value, 
             angle=0, 
-            pen=pg.mkPen(color=color, width=1, style=Qt.DashLine),
+            pen=pen,
             label=name,
             labelOpts={
                 'position': 0.95, 
@@ -144,6 +342,8 @@ class GraphView(QWidget):
         
         # 保存引用以便後續清除
         self.lines.append(line)
+        if key is not None:
+            self._line_by_key[key] = line
         
         return line
     
@@ -173,5 +373,7 @@ class GraphView(QWidget):
     
     def export_image(self, filename):
         """將圖表導出為圖像"""
-        exporter = pg.exporters.ImageExporter(self.plot_widget.plotItem)
-        exporter.export(filename)
\ No newline at end of file
+        # 導出前先寫入尚未刷新的數據
+        self.flush()
+        # 每次導出都重新創建導出器：導出器在創建時記錄圖表尺寸，窗口大小改變後會過時
+        pg.exporters.ImageExporter(self.plot_widget.plotItem).export(filename)
\ No newline at end of file
@@ -1,100 +1,267 @@
 import os
 import sys
+import shutil
 import subprocess
 import signal
 import platform
+import threading
+import queue
+import json
+import re
+import logging
+
+# 可选依赖：安装了 ijson 时增量解析 JSON 输出
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+logger = logging.getLogger(__name__)
+
+# iperf3 文本報告行，例如 "[  5]   0.00-0.50   sec  12.3 MBytes   246 Mbits/sec"
+# 雙向測試時 ID 後面還有 "[TX-C]" / "[RX-C]" 之類的標記
+_IPERF_LINE_RE = re.compile(
+    r'^\[\s*(\d+|SUM)\](?:\[[\w-]+\])?\s+([\d.]+)-([\d.]+)\s+sec'
+    r'\s+([\d.]+)\s+(\w*Bytes)\s+([\d.]+)\s+(\w*bits/sec)',
+    re.ASCII)
+
+# JSON 輸出中需要解析的對象：每個 interval 及最終的 end 匯總
+_JSON_PREFIXES = ("intervals.item", "end")
+
+# 速率單位換算為 Mbits/sec 的系數
+_RATE_TO_MBPS = {
+    "bits/sec": 1e-6,
+    "Kbits/sec": 1e-3,
+    "Mbits/sec": 1.0,
+    "Gbits/sec": 1e3,
+    "Tbits/sec": 1e6
+}
+
+def parse_report_line(line):
+    """解析 iperf3 文本報告行，返回 (結束時間, 頻寬Mbps)，不匹配時返回 None"""
+    match = _IPERF_LINE_RE.match(line)
+    if not match:
+        return None
+    scale = _RATE_TO_MBPS.get(match.group(7))
+    if scale is None:
+        return None
+    return float(match.group(3)), float(match.group(6)) * scale
+
+
+class _LineTee:
+    """把读到的每一行转发到输出队列，同时以字节形式提供给 ijson 解析"""
+    
+    def __init__(self, stream, lines):
+        self.stream = stream
+        self.lines = lines
+    
+    def read(self, size=-1):
+        if size == 0:
+            return b""
+        line = self.stream.readline()
+        if line:
+            self.lines.put(line)
+        return line.encode("utf-8")
+
 
 class IperfController:
     """控制iperf3命令的执行"""
     
-    def __init__(self):
+    # 每條命令都帶有的固定參數
+    _STATIC_ARGS = ("-i", "0.5")
+    
+    # 每次從輸出隊列中最多取出的行數
+    _BATCH_SIZE = 32
+    
+    # 进程级缓存，同一进程内的多个控制器共用探测结果
+    _iperf_path_cache = None
+    _bidir_supported_cache = None
+    
+    def __init__(self, config_manager=None):
         self.process = None
+        self.config_manager = config_manager
+        self.iperf_path = self._find_iperf_path()
+        # 上次運行時 iperf3 路徑無法執行，下次 prepare() 時清除緩存並重新探測
+        self._path_failed = False
+    
+    def prepare(self, params):
+        """在 GUI 線程中、啟動工作線程之前調用
+        
+        需要讀寫配置的探測都在這裡完成，工作線程中的 build_command 只使用緩存的結果，
+        不會與 GUI 線程同時修改配置或寫入配置文件。
+        """
+        if self._path_failed:
+            self._path_failed = False
+            self._invalidate_cache()
+        if params.get("bidirectional", False):
+            self._supports_bidir  # 觸發 --bidir 支持檢測並保存結果
+    
+    def _is_valid_path(self, path):
+        """检查缓存的iperf3路径是否仍然存在"""
+        return os.path.isfile(path) or shutil.which(path) is not None
+    
+    def _save_to_config(self, key, value):
+        """将探测结果保存到配置文件"""
+        if not self.config_manager:
+            return
+        config = self.config_manager.load_config()
+        config[key] = value
+        self.config_manager.save_config(config)
+    
+    def _invalidate_cache(self):
+        """缓存的iperf3路径无法执行时，清除所有探测缓存并重新查找iperf3"""
+        IperfController._iperf_path_cache = None
+        IperfController._bidir_supported_cache = None
+        if self.config_manager:
+            config = self.config_manager.load_config()
+            config.pop("iperf_path", None)
+            config.get("iperf_bidir", {}).pop(self.iperf_path, None)
+            self.config_manager.save_config(config)
         self.iperf_path = self._find_iperf_path()
     
     def _find_iperf_path(self):
         """查找iperf3可执行文件的路径"""
+        # 优先使用缓存的路径（进程内缓存，其次是配置文件）
+        cached_path = IperfController._iperf_path_cache
+        if cached_path is None and self.config_manager:
+            cached_path = self.config_manager.load_config().get("iperf_path")
+        if cached_path and self._is_valid_path(cached_path):
+            IperfController._iperf_path_cache = cached_path
+            return cached_path
+        
         # 首先检查当前目录和程序所在目录
         current_dir = os.path.dirname(os.path.abspath(__file__))
-        possible_paths = [
-            os.path.join(current_dir, "iperf3"),
-            os.path.join(current_dir, "iperf3.exe"),
-            "iperf3",  # 系统PATH中的iperf3
-            "iperf3.exe"
-        ]
-        
-        # 在Windows上，也检查Program Files目录
+        
         if platform.system() == "Windows":
+            # 在Windows上，也检查Program Files目录
             program_files = os.environ.get("ProgramFiles", "C:\\Program Files")
             program_files_x86 = os.environ.get("ProgramFiles(x86)", "C:\\Program Files (x86)")
             
-            possible_paths.extend([
+            possible_paths = [
+                os.path.join(current_dir, "iperf3.exe"),
+                "iperf3.exe",  # 系统PATH中的iperf3
                 os.path.join(program_files, "iperf3", "iperf3.exe"),
                 os.path.join(program_files_x86, "iperf3", "iperf3.exe")
-            ])
+            ]
+        else:
+            possible_paths = [
+                os.path.join(current_dir, "iperf3"),
+                "iperf3"  # 系统PATH中的iperf3
+            ]
         
         # 尝试每个可能的路径
         for path in possible_paths:
+            # 先用 stat / PATH 查找过滤掉不存在的路径，避免无谓地启动进程
+            if os.path.basename(path) == path:
+                resolved = shutil.which(path)
+            else:
+                resolved = path if os.path.isfile(path) else None
+            if not resolved:
+                continue
+            
             try:
                 # 尝试运行iperf3 --version来检查是否可用
-                subprocess.run([path, "--version"], 
-                               stdout=subprocess.PIPE, 
-                               stderr=subprocess.PIPE, 
-                               check=True)
-                return path
-            except (subprocess.SubprocessError, FileNotFoundError):
+                subprocess.run([resolved, "--version"], 
+                               stdout=subprocess.DEVNULL, 
+                               stderr=subprocess.DEVNULL, 
+                               check=True,
+                               timeout=2)
+                IperfController._iperf_path_cache = resolved
+                self._save_to_config("iperf_path", resolved)
+                return resolved
+            except (subprocess.SubprocessError, OSError):
                 continue
         
         # 如果找不到iperf3，返回默认值，后续会检查并提示用户
         return "iperf3"
     
-    def run_iperf_command(self, params, callback=None):
-        """運行 iperf 命令"""
-        cmd = [self.iperf_path]
+    @property
+    def _supports_bidir(self):
+        """检测iperf3是否支持--bidir参数，检测成功后缓存结果，只运行一次--help"""
+        if IperfController._bidir_supported_cache is not None:
+            return IperfController._bidir_supported_cache
         
-        if params["mode"] == "server":
-            cmd.append("-s")
-        else:  # client mode
-            cmd.append("-c")
-            cmd.append(params["host"])
+        # 配置文件中按iperf3路径保存了之前的检测结果
+        if self.config_manager:
+            saved = self.config_manager.load_config().get("iperf_bidir", {})
+            if self.iperf_path in saved:
+                IperfController._bidir_supported_cache = saved[self.iperf_path]
+                return IperfController._bidir_supported_cache
+        
+        try:
+            help_output = subprocess.check_output([self.iperf_path, "--help"],
+                                                  stderr=subprocess.STDOUT,
+                                                  universal_newlines=True)
+        except (subprocess.SubprocessError, OSError):
+            # 如果無法檢查，預設使用 --bidir（不缓存，下次重新检测）
+            return True
         
-        # 添加端口
-        cmd.extend(["-p", str(params["port"])])
+        supported = "--bidir" in help_output
+        IperfController._bidir_supported_cache = supported
+        if self.config_manager:
+            saved = self.config_manager.load_config().get("iperf_bidir", {})
+            self._save_to_config("iperf_bidir", {**saved, self.iperf_path: supported})
+        return supported
+    
+    def build_command(self, params):
+        """根據參數構建 iperf3 命令列表"""
+        mode = params["mode"]
+        parallel = params.get("parallel", 1)
+        
+        cmd = [self.iperf_path]
+        cmd += ("-s",) if mode == "server" else ("-c", params["host"])
         
-        # 添加時間
-        cmd.extend(["-t", str(params["time"])])
+        # 添加端口和時間
+        cmd += ("-p", str(params["port"]), "-t", str(params["time"]))
         
         # 添加輸出格式
         if params.get("format") == "json":
             cmd.append("-J")
         
         # 添加間隔參數，使 iperf 每 0.5 秒輸出一次結果
-        cmd.extend(["-i", "0.5"])
+        cmd += self._STATIC_ARGS
         
         # 添加並行連接數
-        if params.get("parallel", 1) > 1:
-            cmd.extend(["-P", str(params["parallel"])])
+        if parallel > 1:
+            cmd += ("-P", str(parallel))
         
         # 添加雙向測試選項
         if params.get("bidirectional", False):
-            # 嘗試使用 --bidir 參數（較新版本的 iperf3）
-            try:
-                test_cmd = [self.iperf_path, "--help"]
-                help_output = subprocess.check_output(test_cmd, universal_newlines=True)
-                if "--bidir" in help_output:
-                    cmd.append("--bidir")
-                else:
-                    # 舊版本可能使用 -d 或 --dualtest
-                    cmd.append("-d")
-            except:
-                # 如果無法檢查，預設使用 --bidir
-                cmd.append("--bidir")
+            # 較新版本的 iperf3 使用 --bidir，舊版本可能使用 -d 或 --dualtest
+            cmd.append("--bidir" if self._supports_bidir else "-d")
         
         # 添加其他參數
         if "bandwidth" in params:
-            cmd.extend(["-b", str(params["bandwidth"])])
+            cmd += ("-b", str(params["bandwidth"]))
+        
+        return cmd
+    
+    def run_iperf_command(self, params, callback=None, interval_callback=None, batch_callback=None,
+                          end_callback=None):
+        """運行 iperf 命令
+        
+        使用 JSON 輸出時，解析出的每個 interval 字典會傳給 interval_callback，
+        最終的 end 匯總字典會傳給 end_callback。
+        提供 batch_callback 時，每次從隊列取出的輸出行以列表形式一次性傳入，
+        代替逐行調用 callback。
+        """
+        def report(lines):
+            if batch_callback:
+                batch_callback(lines)
+            elif callback:
+                for line in lines:
+                    callback(line)
+        
+        cmd = self.build_command(params)
         
-        # 打印命令
-        print(f"Running command: {' '.join(cmd)}")
+        # 記錄命令（只在啟用 DEBUG 時才格式化）
+        logger.debug("Running command: %s", cmd)
+        
+        # 在獨立的進程組中啟動，停止時可以直接向其發送信號
+        if platform.system() == "Windows":
+            group_kwargs = {"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP}
+        else:
+            group_kwargs = {"start_new_session": True}
         
         # 運行命令
         try:
@@ -102,37 +269,127 @@ class IperfController:
                 cmd,
                 stdout=subprocess.PIPE,
                 stderr=subprocess.STDOUT,
-                text=True,
-                bufsize=1,
-                universal_newlines=True
+                encoding="utf-8",
+                errors="replace",
+                bufsize=-1,  # 使用默認塊緩衝，由文件迭代按行切分
+                **group_kwargs
             )
             
-            # 讀取輸出
-            for line in iter(self.process.stdout.readline, ''):
-                if callback:
-                    callback(line.strip())
-                if not line:
+            process = self.process
+            
+            # 由後台線程讀取管道，回調變慢時不會反壓 iperf3
+            lines = queue.Queue(maxsize=1024)
+            parse_json = ((interval_callback is not None or end_callback is not None)
+                          and params.get("format") == "json")
+            reader = threading.Thread(target=self._reader,
+                                      args=(process.stdout, lines, parse_json),
+                                      daemon=True)
+            reader.start()
+            
+            # 批量取出輸出行並交給回調
+            while True:
+                batch = [lines.get()]
+                while len(batch) < self._BATCH_SIZE:
+                    try:
+                        batch.append(lines.get_nowait())
+                    except queue.Empty:
+                        break
+                
+                # None 表示輸出已結束，且一定是最後一項
+                done = batch[-1] is None
+                if done:
+                    batch.pop()
+                output = []
+                for item in batch:
+                    if isinstance(item, str):
+                        output.append(item.strip())
+                        continue
+                    # 解析好的 JSON 對象：("intervals.item" 或 "end", 字典)
+                    kind, value = item
+                    if kind == "end":
+                        if end_callback:
+                            end_callback(value)
+                    elif interval_callback:
+                        interval_callback(value)
+                if output:
+                    report(output)
+                if done:
                     break
             
-            self.process.wait()
+            process.wait()
+        except OSError as e:
+            # 缓存的路径已无法执行，下次 prepare() 时在 GUI 线程中清除缓存并重新探测
+            self._path_failed = True
+            report([f"Error: {str(e)}"])
         except Exception as e:
-            if callback:
-                callback(f"Error: {str(e)}")
+            report([f"Error: {str(e)}"])
+    
+    @staticmethod
+    def _reader(stream, lines, parse_json=False):
+        """在後台線程中讀取 iperf3 輸出並放入隊列
+        
+        parse_json 為 True 時同時解析 JSON 輸出，把每個 interval 字典和最終的
+        end 字典以 (前綴, 字典) 的形式也放入隊列。
+        """
+        if parse_json and ijson is not None:
+            # 邊讀邊解析，只為 interval 和 end 構建對象，不需要保留完整的 JSON 文本
+            builder = None
+            try:
+                for prefix, event, value in ijson.parse(_LineTee(stream, lines), use_float=True):
+                    if builder is None:
+                        if event != "start_map" or prefix not in _JSON_PREFIXES:
+                            continue
+                        builder = ijson.ObjectBuilder()
+                        target = prefix
+                    builder.event(event, value)
+                    if event == "end_map" and prefix == target:
+                        lines.put((target, builder.value))
+                        builder = None
+            except ijson.JSONError:
+                pass
+        elif parse_json:
+            # 沒有安裝 ijson 時，在輸出結束後一次性解析
+            chunks = []
+            for line in stream:
+                lines.put(line)
+                chunks.append(line)
+            try:
+                data = json.loads("".join(chunks))
+            except ValueError:
+                data = {}
+            del chunks
+            for interval in data.get("intervals", []):
+                lines.put(("intervals.item", interval))
+            if "end" in data:
+                lines.put(("end", data["end"]))
+        
+        # 轉發剩餘的輸出行
+        for line in stream:
+            lines.put(line)
+        lines.put(None)
     
     def stop_iperf(self):
         """停止正在运行的iperf进程"""
         if self.process:
-            if platform.system() == "Windows":
-                # Windows上使用taskkill强制终止进程
-                subprocess.run(["taskkill", "/F", "/T", "/PID", str(self.process.pid)], 
-                               stdout=subprocess.PIPE, 
-                               stderr=subprocess.PIPE)
-            else:
-                # Linux/Mac上使用SIGTERM信号
-                self.process.terminate()
-                try:
-                    self.process.wait(timeout=5)
-                except subprocess.TimeoutExpired:
-                    self.process.kill()  # 如果进程没有及时终止，强制杀死
+            try:
+                if platform.system() == "Windows":
+                    # Windows上发送Ctrl+Break，iperf3会正常退出并输出结果
+                    self.process.send_signal(signal.CTRL_BREAK_EVENT)
+                    timeout = 2
+                else:
+                    # Linux/Mac上向整个进程组发送SIGTERM信号
+                    os.killpg(os.getpgid(self.process.pid), signal.SIGTERM)
+                    timeout = 5
+                self.process.wait(timeout=timeout)
+            except subprocess.TimeoutExpired:
+                self.process.kill()  # 如果进程没有及时终止，强制杀死
+            except OSError:
+                # 发送信号失败（例如进程已经退出，或 Windows 上没有控制台时无法发送 Ctrl+Break），
+                # 进程仍在运行时强制杀死
+                if self.process.poll() is None:
+                    try:
+                        self.process.kill()
+                    except OSError:
+                        pass  # 进程刚好已经退出
             
-            self.process = None
\ No newline at end of file
+            self.process = None
@@ -20,55 +20,230 @@ along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
 import sys
 import os
+import re
 import threading
-import json
+import queue
 import time
+import locale
 import math
-import random
+import logging
+import numpy as np
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
                             QHBoxLayout, QLabel, QLineEdit, QPushButton, 
                             QComboBox, QSpinBox, QDoubleSpinBox, QCheckBox, 
-                            QTabWidget, QTextEdit, QFileDialog, QMessageBox,
+                            QTabWidget, QPlainTextEdit, QFileDialog, QMessageBox,
                             QGroupBox, QFormLayout, QRadioButton, QButtonGroup)
-from PyQt5.QtCore import Qt, pyqtSignal, QThread, QSettings, QTimer
+from PyQt5.QtCore import (Qt, pyqtSignal, QObject, QRunnable, QThreadPool,
+                          QSettings, QTimer)
 from PyQt5.QtGui import QFont, QIcon, QDesktopServices
 from PyQt5.QtCore import QUrl
 
-from iperf_controller import IperfController
+from iperf_controller import IperfController, parse_report_line
 from graph_view import GraphView
 from language_resources import LanguageResources
 from config_manager import ConfigManager
 
-class IperfWorker(QThread):
-    """用于在后台运行iperf3的线程"""
-    output_received = pyqtSignal(str)
-    finished = pyqtSignal()
+logger = logging.getLogger(__name__)
+
+# 可选依赖：安裝了 icmplib 時直接發送 ICMP 請求，不需要啟動 ping 進程
+try:
+    import icmplib
+except ImportError:
+    icmplib = None
+
+# ping 輸出中的延遲，模塊加載時編譯一次
+# 與系統語言無關的延遲格式：緊跟在 "=" 或 "<" 後面的數值加 ms，
+# 例如 "時間=5ms"、"time<1ms"、"czas=5ms"、"time=0.045 ms"
+# 使用 re.ASCII：\d 只匹配 0-9，"ms" 後緊跟中文字符時 \b 同樣成立
+_PING_PATTERN_ANY = re.compile(r"[=<]([\d.]+) ?ms\b", re.ASCII)
+
+# 數據緩衝區使用 float32，超出其範圍（或 NaN）的數值直接丟棄
+_FLOAT32_MAX = float(np.finfo(np.float32).max)
+
+# 頻寬圖表中的數據系列：(系列, 顏色, 統計標籤高度相對最大值的比例)
+_SERIES_SPEC = (
+    ("default", (0, 0, 255), 0.9),   # 默認數據系列（單向測試）
+    ("sent", (255, 0, 0), 0.7),      # 發送數據系列（雙向測試），低於默認系列
+    ("received", (0, 255, 0), 0.5)   # 接收數據系列（雙向測試），低於其他系列
+)
+
+# 輸出區域的等寬字體，所有文本框共用（QFont 需在 QApplication 創建後才能構造）
+_MONO_FONT = None
+
+def _mono_font():
+    """獲取共用的等寬字體"""
+    global _MONO_FONT
+    if _MONO_FONT is None:
+        _MONO_FONT = QFont("Courier New", 10)
+    return _MONO_FONT
+
+class IperfWorker(QRunnable):
+    """在線程池中运行iperf3的任务
+    
+    輸出的解析也在工作線程中完成，GUI 線程只收到解析好的 (系列, 時間, Mbps) 數據點。
+    """
+    
+    # JSON interval 中的匯總字段及其對應的數據系列
+    _INTERVAL_SERIES = (("sum", "default"), ("sum_sent", "sent"), ("sum_received", "received"))
+    
+    class Signals(QObject):
+        """QRunnable 不是 QObject，信號放在單獨的對象上"""
+        output_received = pyqtSignal(list)  # 一批輸出行
+        sample = pyqtSignal(str, float, float)  # 數據點 (系列, 時間, 頻寬 Mbps)
+        finished = pyqtSignal()
     
     def __init__(self, controller, params):
         super().__init__()
+        self.setAutoDelete(False)  # 由 GUI 持有引用，不讓線程池刪除
+        self.signals = self.Signals()
         self.controller = controller
         self.params = params
         
     def run(self):
         self.controller.run_iperf_command(self.params, 
-                                          callback=lambda line: self.output_received.emit(line))
-        self.finished.emit()
+                                          batch_callback=self._process_output,
+                                          interval_callback=self._process_interval,
+                                          end_callback=self._process_end)
+        self.signals.finished.emit()
+    
+    def _process_output(self, lines):
+        """轉發一批輸出行，並從中解析數據點"""
+        self.signals.output_received.emit(lines)
+        for line in lines:
+            self._process_output_line(line)
+    
+    def _process_output_line(self, line):
+        """解析一行 iperf 輸出"""
+        # JSON 輸出由控制器解析，interval 和 end 分別送到 _process_interval 和 _process_end
+        try:
+            # 處理非 JSON 格式的輸出（例如，實時更新），檢查是否包含帶寬信息
+            if "bits/sec" in line:
+                logger.debug("Found bandwidth info in line: %s", line)
+                # 使用預編譯的正則表達式提取帶寬數據（已轉換為 Mbits/sec）
+                result = parse_report_line(line)
+                if result:
+                    end_time, value = result
+                    
+                    logger.debug("Extracted from text: time=%s, bandwidth=%s", end_time, value)
+                    
+                    # 檢測是發送還是接收數據
+                    series = "default"
+                    lower = line.lower()
+                    if "sender" in lower:
+                        series = "sent"
+                    elif "receiver" in lower:
+                        series = "received"
+                    
+                    self.signals.sample.emit(series, end_time, value)
+        except Exception:
+            logger.exception("Error processing output")
+    
+    def _process_end(self, end):
+        """處理 iperf JSON 結果中的 end 對象，只取最終匯總數據"""
+        logger.debug("Parsed JSON end keys: %s", end.keys())
+        
+        # 每次 TCP 客戶端測試的 end 都同時包含 sum_sent 和 sum_received，
+        # 只有雙向測試才把它們顯示為上傳/下載系列
+        if not self.params.get("bidirectional", False):
+            return
+        
+        # 最終結果放在測試結束的時間點上
+        test_time = float(self.params["time"])
+        for key, series in self._INTERVAL_SERIES[1:]:
+            if key in end:
+                bandwidth = end[key]["bits_per_second"] / 1000000
+                logger.debug("Final %s bandwidth: %s Mbps", series, bandwidth)
+                self.signals.sample.emit(series, test_time, bandwidth)
+    
+    def _process_interval(self, interval):
+        """把一個 iperf JSON interval 轉換為數據點"""
+        # 單向測試只有 sum，雙向測試另有 sum_sent / sum_received
+        for key, series in self._INTERVAL_SERIES:
+            if key in interval:
+                time_sec = interval[key]["start"]
+                bandwidth = interval[key]["bits_per_second"] / 1000000  # 轉換為 Mbps
+                logger.debug("Extracted %s data: time=%s, bandwidth=%s", series, time_sec, bandwidth)
+                self.signals.sample.emit(series, float(time_sec), bandwidth)
 
-class PingWorker(QThread):
-    """用於在後台運行 ping 的線程"""
-    output_received = pyqtSignal(str)
-    ping_result = pyqtSignal(float)  # 發送 ping 延遲結果 (ms)
-    finished = pyqtSignal()
+class PingWorker(QRunnable):
+    """在線程池中運行 ping 的任務"""
+    
+    # 輸出行累積到這麼多行或這麼長時間（秒）後才發送一次信號
+    _BATCH_SIZE = 32
+    _BATCH_INTERVAL = 0.05
+    
+    class Signals(QObject):
+        """QRunnable 不是 QObject，信號放在單獨的對象上"""
+        output_received = pyqtSignal(list)  # 一批輸出行
+        ping_result = pyqtSignal(float)  # 發送 ping 延遲結果 (ms)
+        finished = pyqtSignal()
     
     def __init__(self, host, count=None):
         super().__init__()
+        self.setAutoDelete(False)  # 由 GUI 持有引用，不讓線程池刪除
+        self.signals = self.Signals()
         self.host = host  # 可以是域名或 IP 地址
         self.count = count  # None 表示持續 ping
-        self.running = True
+        self._stop_event = threading.Event()
+        self._lines = []
+        self._last_emit = 0.0
+    
+    @property
+    def running(self):
+        return not self._stop_event.is_set()
+    
+    def _output(self, line):
+        """累積一行輸出，夠一批或距上次發送超過間隔時才發送信號"""
+        self._lines.append(line)
+        if (len(self._lines) >= self._BATCH_SIZE
+                or time.perf_counter() - self._last_emit >= self._BATCH_INTERVAL):
+            self._flush_output()
+    
+    def _flush_output(self):
+        """發送所有已累積的輸出行"""
+        if self._lines:
+            self.signals.output_received.emit(self._lines)
+            self._lines = []
+        self._last_emit = time.perf_counter()
     
     def run(self):
+        # 優先使用 icmplib，沒有權限創建 ICMP 套接字時回退到系統 ping 命令
+        if icmplib is not None:
+            try:
+                self._run_icmplib()
+            except icmplib.SocketPermissionError:
+                self._run_command()
+            except icmplib.ICMPLibError as e:
+                self._output(f"錯誤: {str(e)}")
+        else:
+            self._run_command()
+        
+        self._flush_output()
+        self.signals.finished.emit()
+    
+    def _run_icmplib(self):
+        """使用 icmplib 每秒發送一次 ICMP 請求，直接得到延遲值"""
+        sent = 0
+        while self.running and (self.count is None or sent < self.count):
+            next_time = time.perf_counter() + 1
+            host = icmplib.ping(self.host, count=1, timeout=1, privileged=False)
+            sent += 1
+            
+            if sent == 1:
+                self._output(f"ICMP ping: {self.host} ({host.address})")
+            if host.is_alive:
+                self._output(f"{host.address}: icmp_seq={sent} time={host.avg_rtt:.2f} ms")
+                self.signals.ping_result.emit(host.avg_rtt)
+            else:
+                self._output(f"{host.address}: icmp_seq={sent} timeout")
+            self._flush_output()
+            
+            # 等待到下一秒，停止時立即返回
+            self._stop_event.wait(max(0, next_time - time.perf_counter()))
+    
+    def _run_command(self):
+        """運行系統 ping 命令並解析輸出"""
         import subprocess
-        import re
         
         # 根據操作系統選擇 ping 命令
         if sys.platform == "win32":
@@ -77,74 +252,107 @@ class PingWorker(QThread):
                 cmd = ["ping", self.host, "-t"]  # 持續 ping
             else:
                 cmd = ["ping", self.host, "-n", str(self.count)]
-            
-            # 繁體中文 Windows 的輸出格式: 回覆自 8.8.8.8: 位元組=32 時間=5ms TTL=116
-            pattern = r"時間=(\d+)ms"
         else:  # Linux/Mac
             # Linux/Mac 命令格式
             if self.count is None:
                 cmd = ["ping", self.host]  # 持續 ping
             else:
                 cmd = ["ping", "-c", str(self.count), self.host]
-            pattern = r"time=([\d\.]+) ms"
         
-        self.output_received.emit(f"執行命令: {' '.join(cmd)}")
+        # 延遲格式與系統語言無關，所有平台共用同一個正則表達式
+        pattern = _PING_PATTERN_ANY
+        
+        self._output(f"執行命令: {' '.join(cmd)}")
         
         try:
-            # 啟動 ping 進程，使用較大的緩衝區
+            # 啟動 ping 進程，以字節方式讀取並使用默認的塊緩衝
             process = subprocess.Popen(
                 cmd, 
                 stdout=subprocess.PIPE, 
                 stderr=subprocess.PIPE,
-                text=True,
-                bufsize=1,  # 行緩衝
-                universal_newlines=True
+                bufsize=-1
             )
             
+            # 每個管道由一個後台線程讀取，主循環不會阻塞在讀取上，可以及時響應停止
+            # ping 的輸出使用系統區域編碼（與 text=True 時相同）
+            encoding = locale.getpreferredencoding(False)
+            lines = queue.Queue()
+            for pipe, tag in ((process.stdout, "out"), (process.stderr, "err")):
+                threading.Thread(target=self._read_pipe, args=(pipe, tag, lines, encoding),
+                                 daemon=True).start()
+            open_pipes = 2
+            
             # 讀取輸出
-            while self.running:
-                line = process.stdout.readline()
-                if not line:
-                    # 檢查是否有錯誤輸出
-                    error = process.stderr.readline()
-                    if error:
-                        self.output_received.emit(f"錯誤: {error.strip()}")
-                    break
+            while self.running and open_pipes:
+                try:
+                    tag, line = lines.get(timeout=0.1)
+                except queue.Empty:
+                    # 暫時沒有新輸出，把累積的行發送出去
+                    self._flush_output()
+                    continue
+                
+                if line is None:
+                    open_pipes -= 1
+                    continue
                 
-                self.output_received.emit(line.strip())
+                # 錯誤輸出
+                if tag == "err":
+                    self._output(f"錯誤: {line.strip()}")
+                    continue
+                
+                self._output(line.strip())
                 
                 # 解析 ping 時間
-                match = re.search(pattern, line)
+                match = pattern.search(line)
                 if match:
                     try:
                         ping_time = float(match.group(1))
                         # 直接發送信號，不進行額外處理
-                        self.ping_result.emit(ping_time)
+                        self.signals.ping_result.emit(ping_time)
                     except ValueError:
-                        self.output_received.emit(f"無法解析延遲值: {match.group(1)}")
+                        self._output(f"無法解析延遲值: {match.group(1)}")
             
             # 終止進程
             if not self.running:
                 process.terminate()
-                process.wait()
+            process.wait()
                 
         except Exception as e:
-            self.output_received.emit(f"錯誤: {str(e)}")
-        
-        self.finished.emit()
+            self._output(f"錯誤: {str(e)}")
+    
+    @staticmethod
+    def _read_pipe(pipe, tag, lines, encoding):
+        """在後台線程中按 4 KB 塊讀取管道並切分成行
+        
+        每行連同來源標記放入隊列，結束時放入 None。
+        read1 只返回已經可讀的數據，不會等待湊滿 4 KB。
+        """
+        pending = b""
+        for chunk in iter(lambda: pipe.read1(4096), b""):
+            *complete, pending = (pending + chunk).split(b"\n")
+            for line in complete:
+                lines.put((tag, line.decode(encoding, "replace")))
+        if pending:
+            lines.put((tag, pending.decode(encoding, "replace")))
+        lines.put((tag, None))
     
     def stop(self):
-        self.running = False
+        self._stop_event.set()
 
 class IperfGUI(QMainWindow):
     """iperf3 GUI主窗口"""
     
     def __init__(self):
         super().__init__()
-        self.controller = IperfController()
-        self.worker = None
         self.config_manager = ConfigManager()
+        self.controller = IperfController(self.config_manager)
+        self.worker = None
         
+        # iperf 和 ping 任務專用的線程池：持續 ping 會一直佔用一個線程，
+        # 不能使用大小取決於 CPU 核心數的全局線程池，否則單核機器上 iperf 會一直排隊
+        self.thread_pool = QThreadPool(self)
+        self.thread_pool.setMaxThreadCount(2)
+
         # 加载配置
         self.config = self.config_manager.load_config()
         
@@ -154,6 +362,21 @@ class IperfGUI(QMainWindow):
         # 设置当前语言
         self.current_language = self.config.get("language", "zh_tw")
         self.lang = self.lang_resources[self.current_language]
+        self._refresh_lang_cache()
+        
+        # 合併短時間內的多次配置保存，只寫一次磁盤
+        self.config_save_timer = QTimer()
+        self.config_save_timer.setSingleShot(True)
+        self.config_save_timer.setInterval(500)
+        self.config_save_timer.timeout.connect(self.save_config)
+        
+        # 輸出行先放入緩衝區，每 100 毫秒最多寫入文本框一次
+        self._out_buf = []
+        self._ping_out_buf = []
+        self.output_flush_timer = QTimer()
+        self.output_flush_timer.setSingleShot(True)
+        self.output_flush_timer.setInterval(100)
+        self.output_flush_timer.timeout.connect(self.flush_output)
         
         # 初始化数据存储
         self.x_data = []
@@ -162,30 +385,32 @@ class IperfGUI(QMainWindow):
         # 初始化 ping 相關變量
         self.ping_worker = None
         self.ping_running = False
-        self.ping_x_data = []
-        self.ping_y_data = []
+        # ping 圖表的環形緩衝區只保留最近的數據點，超出時自動丟棄最舊的點
+        self.ping_max_points = 300
         self.ping_start_time = 0
         self.ping_display_window = 60  # 顯示最近 60 秒的數據
-        
-        # 添加用於統計的變量
-        self.stats = {
-            "default": {"max": 0, "min": float('inf'), "sum": 0, "count": 0},
-            "sent": {"max": 0, "min": float('inf'), "sum": 0, "count": 0},
-            "received": {"max": 0, "min": float('inf'), "sum": 0, "count": 0}
-        }
-        
-        # 創建定時器，每 0.5 秒更新一次圖表
-        self.update_timer = QTimer()
-        self.update_timer.setInterval(500)  # 500毫秒 = 0.5秒
-        self.update_timer.timeout.connect(self.update_graph)
-        print("定時器已創建，間隔：", self.update_timer.interval(), "ms")
-        
-        # 初始化數據系列
-        self.series_data = {
-            "default": {"x": [], "y": []},
-            "sent": {"x": [], "y": []},
-            "received": {"x": [], "y": []}
-        }
+        # 上次設置的 ping 圖表 X 軸範圍，窗口移動不足 0.05 秒時不重新設置
+        self._ping_last_xrange = None
+        # 尚未繪製的 ping 數據點 (時間, 延遲)，33 毫秒內到達的點合併為一次重繪
+        self._pending_pings = []
+        self._ping_graph_timer = QTimer()
+        self._ping_graph_timer.setSingleShot(True)
+        self._ping_graph_timer.setInterval(33)
+        self._ping_graph_timer.timeout.connect(self._flush_ping_graph)
+        
+        # 圖表測試模式的定時器，開始測試時才創建
+        self.test_timer = None
+        
+        # 初始化數據系列和統計數據
+        self.reset_series_data()
+        
+        # 有新數據時標記圖表需要重繪，由單次定時器合併後統一重繪，
+        # 無論數據來得多快，每秒最多重繪約 30 次
+        self._graph_dirty = False
+        self._graph_timer = QTimer()
+        self._graph_timer.setSingleShot(True)
+        self._graph_timer.setInterval(33)
+        self._graph_timer.timeout.connect(self._flush_graph)
         
         # GitHub 倉庫 URL
         self.github_url = "https://github.com/ystartgo/iperf3_UI"
@@ -194,8 +419,12 @@ class IperfGUI(QMainWindow):
     
     def init_ui(self):
         """初始化用户界面"""
+        # 語言字典及其 get 方法綁定為局部變量，創建控件時不再重複查找屬性
+        lang = self.lang
+        tr = lang.get
+        
         # 设置窗口基本属性
-        self.setWindowTitle(self.lang["window_title"])
+        self.setWindowTitle(lang["window_title"])
         self.setGeometry(100, 100, 900, 600)
         
         # 创建中央部件和主布局
@@ -203,15 +432,15 @@ class IperfGUI(QMainWindow):
         main_layout = QVBoxLayout(central_widget)
         
         # 创建顶部控制区域
-        control_group = QGroupBox(self.lang["control"])
+        control_group = QGroupBox(lang["control"])
         control_layout = QVBoxLayout()
         
         # 创建模式选择区域
         mode_layout = QHBoxLayout()
         mode_group = QButtonGroup(self)
         
-        self.server_radio = QRadioButton(self.lang["server"])
-        self.client_radio = QRadioButton(self.lang["client"])
+        self.server_radio = QRadioButton(lang["server"])
+        self.client_radio = QRadioButton(lang["client"])
         mode_group.addButton(self.server_radio)
         mode_group.addButton(self.client_radio)
         self.client_radio.setChecked(True)  # 默认为客户端模式
@@ -234,29 +463,29 @@ class IperfGUI(QMainWindow):
         # 主机输入
         self.host_input = QLineEdit()
         self.host_input.setPlaceholderText("localhost")
-        params_layout.addRow(QLabel(self.lang["host"]), self.host_input)
+        params_layout.addRow(QLabel(lang["host"]), self.host_input)
         
         # 端口输入
         self.port_input = QSpinBox()
         self.port_input.setRange(1024, 65535)
         self.port_input.setValue(5201)  # iperf3默认端口
-        params_layout.addRow(QLabel(self.lang["port"]), self.port_input)
+        params_layout.addRow(QLabel(lang["port"]), self.port_input)
         
         # 时间输入
         self.time_input = QSpinBox()
         self.time_input.setRange(1, 3600)
         self.time_input.setValue(10)  # 默认10秒
-        params_layout.addRow(QLabel(self.lang["test_time"]), self.time_input)
+        params_layout.addRow(QLabel(lang["test_time"]), self.time_input)
         
         # 添加並行連接數控制
         self.parallel_input = QSpinBox()
         self.parallel_input.setRange(1, 100)
         self.parallel_input.setValue(1)  # 默認1個連接
-        params_layout.addRow(QLabel(self.lang["parallel_connections"]), self.parallel_input)
+        params_layout.addRow(QLabel(lang["parallel_connections"]), self.parallel_input)
         
         # 添加雙向測試選項
-        self.bidirectional_check = QCheckBox(self.lang.get("bidirectional", "Bidirectional Test"))
-        self.bidirectional_check.setToolTip(self.lang.get("bidirectional_tooltip", "Test both upload and download speeds simultaneously"))
+        self.bidirectional_check = QCheckBox(tr("bidirectional", "Bidirectional Test"))
+        self.bidirectional_check.setToolTip(tr("bidirectional_tooltip", "Test both upload and download speeds simultaneously"))
         params_layout.addRow("", self.bidirectional_check)
         
         # 添加到控制布局
@@ -267,14 +496,14 @@ class IperfGUI(QMainWindow):
         # 创建按钮区域
         button_layout = QHBoxLayout()
         
-        self.start_button = QPushButton(self.lang["start_test"])
-        self.stop_button = QPushButton(self.lang["stop_test"])
+        self.start_button = QPushButton(lang["start_test"])
+        self.stop_button = QPushButton(lang["stop_test"])
         self.stop_button.setEnabled(False)
-        self.save_button = QPushButton(self.lang["save_results"])
-        self.clear_button = QPushButton(self.lang["clear_results"])
+        self.save_button = QPushButton(lang["save_results"])
+        self.clear_button = QPushButton(lang["clear_results"])
         
         # 添加測試按鈕
-        self.test_button = QPushButton(self.lang.get("test_graph", "Test Graph"))
+        self.test_button = QPushButton(tr("test_graph", "Test Graph"))
         self.test_button.clicked.connect(self.test_graph)
         
         self.start_button.clicked.connect(self.start_test)
@@ -289,16 +518,16 @@ class IperfGUI(QMainWindow):
         button_layout.addWidget(self.test_button)
         
         # 添加 ping 功能
-        ping_group = QGroupBox(self.lang.get("ping", "Ping"))
+        ping_group = QGroupBox(tr("ping", "Ping"))
         ping_layout = QHBoxLayout()
         
         self.ping_host_input = QLineEdit()
         self.ping_host_input.setPlaceholderText("例如: 8.8.8.8 或 example.com")
         
-        self.ping_button = QPushButton(self.lang.get("start_ping", "Start Ping"))
+        self.ping_button = QPushButton(tr("start_ping", "Start Ping"))
         self.ping_button.clicked.connect(self.toggle_ping)
         
-        ping_layout.addWidget(QLabel(self.lang.get("host", "Host")))
+        ping_layout.addWidget(QLabel(tr("host", "Host")))
         ping_layout.addWidget(self.ping_host_input)
         ping_layout.addWidget(self.ping_button)
         
@@ -308,26 +537,31 @@ class IperfGUI(QMainWindow):
         self.tab_widget = QTabWidget()
         
         # 文本输出选项卡
-        self.output_text = QTextEdit()
+        self.output_text = QPlainTextEdit()
         self.output_text.setReadOnly(True)
-        self.output_text.setFont(QFont("Courier New", 10))
-        self.tab_widget.addTab(self.output_text, self.lang["output"])
+        # 不限制行數：保存結果時需要完整的輸出（例如完整的 JSON），每次測試開始時會清空
+        self.output_text.setFont(_mono_font())
+        self.tab_widget.addTab(self.output_text, lang["output"])
         
         # 图形输出选项卡
         self.graph_view = GraphView(self.lang_resources, self.current_language)
-        self.tab_widget.addTab(self.graph_view, self.lang["graph"])
+        self.tab_widget.addTab(self.graph_view, lang["graph"])
+        # 切換回圖表時補上隱藏期間跳過的重繪
+        self.graph_view.shown.connect(self._flush_graph)
         
         # 添加 ping 輸出選項卡
-        self.ping_output = QTextEdit()
+        self.ping_output = QPlainTextEdit()
         self.ping_output.setReadOnly(True)
-        self.ping_output.setFont(QFont("Courier New", 10))
-        self.tab_widget.addTab(self.ping_output, self.lang.get("ping", "Ping"))
+        self.ping_output.setMaximumBlockCount(5000)  # 持續 ping 只保留最近的輸出行
+        self.ping_output.setFont(_mono_font())
+        self.tab_widget.addTab(self.ping_output, tr("ping", "Ping"))
         
         # 添加 ping 圖表選項卡
         self.ping_graph_view = GraphView(self.lang_resources, self.current_language)
-        self.ping_graph_view.plot_widget.setTitle(self.lang.get("ping_latency", "Ping Latency"), color="k", size="14pt")
-        self.ping_graph_view.plot_widget.setLabel('left', self.lang.get("latency", "Latency"), units='ms', color="k")
-        self.tab_widget.addTab(self.ping_graph_view, self.lang.get("ping_graph", "Ping Graph"))
+        self.ping_graph_view.plot_widget.setTitle(tr("ping_latency", "Ping Latency"), color="k", size="14pt")
+        self.ping_graph_view.plot_widget.setLabel('left', tr("latency", "Latency"), units='ms', color="k")
+        self.tab_widget.addTab(self.ping_graph_view, tr("ping_graph", "Ping Graph"))
+        self.ping_graph_view.shown.connect(self._flush_ping_graph)
         
         # 添加所有组件到主布局
         main_layout.addWidget(control_group)
@@ -338,7 +572,7 @@ class IperfGUI(QMainWindow):
         self.setCentralWidget(central_widget)
         
         # 状态栏
-        self.statusBar().showMessage(self.lang["ready"])
+        self.statusBar().showMessage(lang["ready"])
         
         # 连接信号和槽
         self.server_radio.toggled.connect(self.toggle_mode)
@@ -369,6 +603,7 @@ class IperfGUI(QMainWindow):
         if index >= 0 and index < len(lang_codes):
             self.current_language = lang_codes[index]
             self.lang = self.lang_resources[self.current_language]
+            self._refresh_lang_cache()
             
             # 更新图表语言
             self.graph_view.set_language(self.lang_resources, self.current_language)
@@ -376,12 +611,62 @@ class IperfGUI(QMainWindow):
             
             # 保存语言设置
             self.config["language"] = self.current_language
-            self.config_manager.save_config(self.config)
+            self.schedule_config_save()
             
             # 提示用户重启应用
             QMessageBox.information(self, "Language Changed", 
                                    "Please restart the application for language changes to take effect.")
     
+    def _refresh_lang_cache(self):
+        """緩存圖表重繪時用到的語言字符串，語言改變時重新生成"""
+        tr = self.lang.get
+        
+        # 每個系列的 (曲線名稱, 平均線名稱)
+        self._series_labels = {
+            "default": (tr("bandwidth", "頻寬"), tr("average", "平均")),
+            "sent": (tr("bandwidth_sent", "上傳"), tr("upload_average", "上傳平均")),
+            "received": (tr("bandwidth_received", "下載"), tr("download_average", "下載平均"))
+        }
+        
+        # 統計標籤的格式模板，重繪時只需填入數值
+        tail = f"{tr('maximum', '最大')}: {{:.2f}} Mbps\n{tr('minimum', '最小')}: {{:.2f}} Mbps"
+        self._stats_templates = {
+            series: f"{avg_name}: {{:.2f}} Mbps\n" + tail
+            for series, (_, avg_name) in self._series_labels.items()
+        }
+    
+    def schedule_config_save(self):
+        """延遲保存配置，500 毫秒內的多次修改合併為一次寫入"""
+        self.config_save_timer.start()
+    
+    def save_config(self):
+        """立即保存配置"""
+        self.config_save_timer.stop()
+        self.config_manager.save_config(self.config)
+    
+    def closeEvent(self, event):
+        """關閉窗口前寫入尚未保存的配置，並停止後台任務"""
+        if self.config_save_timer.isActive():
+            self.save_config()
+        
+        # 線程池在退出時會等待任務結束，持續 ping 必須先停止
+        self.stop_ping()
+        if self.worker:
+            self.controller.stop_iperf()
+        # 等任務結束後再銷毀窗口，避免工作線程向已刪除的信號對象發送信號
+        self.thread_pool.waitForDone(5000)
+        super().closeEvent(event)
+    
+    def flush_output(self):
+        """把緩衝的輸出行一次性追加到文本框"""
+        self.output_flush_timer.stop()
+        if self._out_buf:
+            self.output_text.appendPlainText("\n".join(self._out_buf))
+            self._out_buf.clear()
+        if self._ping_out_buf:
+            self.ping_output.appendPlainText("\n".join(self._ping_out_buf))
+            self._ping_out_buf.clear()
+    
     def start_test(self):
         """开始iperf测试"""
         # 禁用开始按钮，启用停止按钮
@@ -389,20 +674,10 @@ class IperfGUI(QMainWindow):
         self.stop_button.setEnabled(True)
         
         # 清除之前的结果
+        self._out_buf.clear()
         self.output_text.clear()
-        self.series_data = {
-            "default": {"x": [], "y": []},
-            "sent": {"x": [], "y": []},
-            "received": {"x": [], "y": []}
-        }
-        self.graph_view.clear_graph()
-        
-        # 清除之前的統計數據
-        self.stats = {
-            "default": {"max": 0, "min": float('inf'), "sum": 0, "count": 0},
-            "sent": {"max": 0, "min": float('inf'), "sum": 0, "count": 0},
-            "received": {"max": 0, "min": float('inf'), "sum": 0, "count": 0}
-        }
+        self.reset_series_data()
+        self.graph_view.reset_data()
         
         # 获取测试时间
         test_time = self.time_input.value()
@@ -421,20 +696,14 @@ class IperfGUI(QMainWindow):
         # 设置图表的 X 轴范围
         self.graph_view.plot_widget.setXRange(0, min(60, test_time))
         
-        # 创建并启动工作线程
+        # 需要讀寫配置的探測在 GUI 線程中完成，再創建工作任務並交給線程池運行
+        self.controller.prepare(params)
         self.worker = IperfWorker(self.controller, params)
-        self.worker.output_received.connect(self.process_output)
-        self.worker.finished.connect(self.test_finished)
-        self.worker.start()
-        
-        # 確保停止之前的定時器（如果有的話）
-        if self.update_timer.isActive():
-            self.update_timer.stop()
-        
-        # 啟動定時器，每 0.2 秒更新一次圖表（更頻繁的更新）
-        self.update_timer.setInterval(200)  # 200毫秒 = 0.2秒，更頻繁的更新
-        self.update_timer.start()
-        print("定時器已啟動，間隔：", self.update_timer.interval(), "ms")
+        self.worker.signals.output_received.connect(self.process_output)
+        # 數據點在工作線程中解析好後排隊送到 GUI 線程
+        self.worker.signals.sample.connect(self._on_sample, Qt.QueuedConnection)
+        self.worker.signals.finished.connect(self.test_finished)
+        self.thread_pool.start(self.worker)
         
         # 切换到图表选项卡
         self.tab_widget.setCurrentIndex(1)
@@ -444,20 +713,13 @@ class IperfGUI(QMainWindow):
     
     def stop_test(self):
         """停止iperf测试"""
-        if self.worker and self.worker.isRunning():
+        if self.worker:
             self.controller.stop_iperf()
-            self.update_timer.stop()  # 停止定時器
-            print("定時器已停止")
             self.statusBar().showMessage(self.lang["test_stopped"])
     
     def test_finished(self):
         """测试完成后的处理"""
-        # 停止定時器
-        self.update_timer.stop()
-        print("測試完成，定時器已停止")
-        
-        # 最後更新一次圖表，確保顯示最終結果
-        self.update_graph()
+        self.worker = None
         
         # 恢复按钮状态
         self.start_button.setEnabled(True)
@@ -466,174 +728,108 @@ class IperfGUI(QMainWindow):
         # 更新状态栏
         self.statusBar().showMessage(self.lang["test_completed"])
     
-    def process_output(self, line):
-        """處理 iperf 輸出"""
-        # 添加到文本輸出
-        self.output_text.append(line)
-        
-        # 嘗試解析 JSON 數據並更新圖表
-        try:
-            # 檢查是否是 JSON 格式
-            if line.strip().startswith('{') and line.strip().endswith('}'):
-                data = json.loads(line)
-                print(f"Parsed JSON data keys: {data.keys()}")
-                
-                # 檢查是否有 intervals 數據
-                if "intervals" in data:
-                    print(f"Found {len(data['intervals'])} intervals")
-                    updated = False
-                    
-                    for interval in data["intervals"]:
-                        if "sum" in interval:
-                            # 提取時間和帶寬數據
-                            time_sec = interval["sum"]["start"]
-                            bandwidth = interval["sum"]["bits_per_second"] / 1000000  # 轉換為 Mbps
-                            print(f"Extracted data: time={time_sec}, bandwidth={bandwidth}")
-                            self.add_data_point(time_sec, bandwidth)
-                            updated = True
-                        
-                        # 處理雙向測試的數據
-                        if "sum_sent" in interval:
-                            time_sec = interval["sum_sent"]["start"]
-                            bandwidth = interval["sum_sent"]["bits_per_second"] / 1000000
-                            print(f"Extracted sent data: time={time_sec}, bandwidth={bandwidth}")
-                            self.add_data_point(time_sec, bandwidth, series="sent")
-                            updated = True
-                        
-                        if "sum_received" in interval:
-                            time_sec = interval["sum_received"]["start"]
-                            bandwidth = interval["sum_received"]["bits_per_second"] / 1000000
-                            print(f"Extracted received data: time={time_sec}, bandwidth={bandwidth}")
-                            self.add_data_point(time_sec, bandwidth, series="received")
-                            updated = True
-                    
-                    # 如果有更新，強制更新圖表一次（不依賴定時器）
-                    if updated:
-                        self.update_graph()
-                        # 如果當前不是圖表頁面，切換到圖表選項卡
-                        if self.tab_widget.currentIndex() != 1:
-                            self.tab_widget.setCurrentIndex(1)
-                
-                # 檢查是否有最終結果
-                if "end" in data:
-                    if "sum_sent" in data["end"]:
-                        final_bandwidth_sent = data["end"]["sum_sent"]["bits_per_second"] / 1000000
-                        print(f"Final sent bandwidth: {final_bandwidth_sent} Mbps")
-                        # 添加最終發送點
-                        test_time = self.time_input.value()
-                        self.add_data_point(test_time, final_bandwidth_sent, series="sent")
-                    
-                    if "sum_received" in data["end"]:
-                        final_bandwidth_received = data["end"]["sum_received"]["bits_per_second"] / 1000000
-                        print(f"Final received bandwidth: {final_bandwidth_received} Mbps")
-                        # 添加最終接收點
-                        test_time = self.time_input.value()
-                        self.add_data_point(test_time, final_bandwidth_received, series="received")
-                    
-                    # 最終結果出來後強制更新一次圖表
-                    self.update_graph()
-        
-        # 處理非 JSON 格式的輸出（例如，實時更新）
-        except json.JSONDecodeError:
-            # 不是 JSON 格式，檢查是否包含帶寬信息
-            if "bits/sec" in line:
-                print(f"Found bandwidth info in line: {line}")
-                # 使用正則表達式提取帶寬數據
-                import re
-                # 匹配格式如 "0.00-0.50 sec 12.3 MBytes 246 Mbits/sec"
-                match = re.search(r'(\d+\.\d+)-(\d+\.\d+)\s+sec\s+\d+\.?\d*\s+\w+\s+(\d+\.?\d*)\s+(Mbits/sec|Kbits/sec|Gbits/sec)', line)
-                if match:
-                    end_time = float(match.group(2))
-                    value = float(match.group(3))
-                    unit = match.group(4)
-                    
-                    # 轉換為統一單位 (Mbits/sec)
-                    if unit == "Kbits/sec":
-                        value /= 1000
-                    elif unit == "Gbits/sec":
-                        value *= 1000
-                    
-                    print(f"Extracted from text: time={end_time}, bandwidth={value}")
-                    
-                    # 檢測是發送還是接收數據
-                    series = "default"
-                    if "sender" in line.lower():
-                        series = "sent"
-                    elif "receiver" in line.lower():
-                        series = "received"
-                    
-                    self.add_data_point(end_time, value, series=series)
-                    
-                    # 從文本中提取到數據後，也強制更新一次圖表
-                    self.update_graph()
-        except Exception as e:
-            print(f"Error processing output: {e}")
+    def process_output(self, lines):
+        """把一批 iperf 輸出行放入文本輸出緩衝區，解析已在工作線程中完成"""
+        self._out_buf.extend(lines)
+        if not self.output_flush_timer.isActive():
+            self.output_flush_timer.start()
+    
+    def _on_sample(self, series, time_sec, bandwidth):
+        """接收工作線程解析出的數據點"""
+        self.add_data_point(time_sec, bandwidth, series=series)
+    
+    def reset_series_data(self):
+        """重置所有數據系列"""
+        # 圖表測試的數據預先寫入了緩衝區，緩衝區重置後停止模擬
+        if self.test_timer is not None:
+            self.test_timer.stop()
+        
+        # 預分配的 NumPy 緩衝區，n 為已使用的長度；已分配時只把長度歸零，重用緩衝區
+        # 使用 float32：頻寬和時間值的精度足夠，統計計算和繪圖時的數據量減半
+        if getattr(self, "series_data", None) is None:
+            self.series_data = {
+                series: {"x": np.empty(1024, dtype=np.float32),
+                         "y": np.empty(1024, dtype=np.float32),
+                         "n": 0}
+                for series in ("default", "sent", "received")
+            }
+            # 每個系列按量化時間（0.01 秒）索引數據點的位置
+            self._series_index = {"default": {}, "sent": {}, "received": {}}
+        else:
+            for data in self.series_data.values():
+                data["n"] = 0
+            for index in self._series_index.values():
+                index.clear()
     
     def add_data_point(self, time_sec, bandwidth, series="default"):
         """添加數據點到圖表"""
-        # 檢查數據是否有效
-        if bandwidth <= 0:
-            print(f"Ignoring invalid bandwidth value: {bandwidth}")
+        # 檢查數據是否有效（NaN 比較結果為 False，同樣被丟棄）
+        if not 0 < bandwidth <= _FLOAT32_MAX:
+            logger.debug("Ignoring invalid bandwidth value: %s", bandwidth)
             return
         
+        data = self.series_data[series]
+        index = self._series_index[series]
+        key = round(time_sec * 100)  # 允許 0.01 秒的誤差
+        
         # 檢查是否已經有相同時間點的數據，如果有則更新
-        for i, t in enumerate(self.series_data[series]["x"]):
-            if abs(t - time_sec) < 0.01:  # 允許小誤差
-                self.series_data[series]["y"][i] = bandwidth
-                print(f"Updating existing data point in series {series}: time={time_sec}, bandwidth={bandwidth}")
-                break
+        if key in index:
+            data["y"][index[key]] = bandwidth
+            logger.debug("Updating existing data point in series %s: time=%s, bandwidth=%s",
+                         series, time_sec, bandwidth)
         else:
-            # 如果沒有相同時間點的數據，則添加新數據點
-            self.series_data[series]["x"].append(time_sec)
-            self.series_data[series]["y"].append(bandwidth)
-            print(f"Adding new data point to series {series}: time={time_sec}, bandwidth={bandwidth}")
-        
-        # 更新統計數據
-        self.stats[series]["max"] = max(self.stats[series]["max"], bandwidth)
-        self.stats[series]["min"] = min(self.stats[series]["min"], bandwidth)
-        self.stats[series]["sum"] += bandwidth
-        self.stats[series]["count"] += 1
-        
-        # 確保數據按時間排序
-        if len(self.series_data[series]["x"]) > 1:
-            sorted_indices = sorted(range(len(self.series_data[series]["x"])), 
-                                   key=lambda i: self.series_data[series]["x"][i])
-            self.series_data[series]["x"] = [self.series_data[series]["x"][i] for i in sorted_indices]
-            self.series_data[series]["y"] = [self.series_data[series]["y"][i] for i in sorted_indices]
+            n = data["n"]
+            if n == data["x"].size:
+                # 緩衝區已滿時容量翻倍，攤銷後追加仍是 O(1)
+                data["x"] = np.resize(data["x"], n * 2)
+                data["y"] = np.resize(data["y"], n * 2)
+            xs = data["x"]
+            ys = data["y"]
+            
+            # 如果沒有相同時間點的數據，則按時間順序插入新數據點
+            pos = int(np.searchsorted(xs[:n], time_sec))
+            if pos < n:
+                # 插入到中間時，後面的數據點和索引都要後移
+                xs[pos + 1:n + 1] = xs[pos:n]
+                ys[pos + 1:n + 1] = ys[pos:n]
+                for k, i in index.items():
+                    if i >= pos:
+                        index[k] = i + 1
+            xs[pos] = time_sec
+            ys[pos] = bandwidth
+            data["n"] = n + 1
+            index[key] = pos
+            logger.debug("Adding new data point to series %s: time=%s, bandwidth=%s",
+                         series, time_sec, bandwidth)
         
         # 調試輸出
-        print(f"Current data in series {series}: {len(self.series_data[series]['y'])} points")
-        
-        # 獲取測試時間
-        test_time = self.time_input.value()
-        
-        # 注意：不再在這裡調用 update_graph，而是由定時器觸發
+        logger.debug("Current data in series %s: %d points", series, data["n"])
         
-        # 調整 X 軸範圍，顯示當前時間附近的數據
-        current_time = time_sec
-        window_size = min(60, test_time)  # 顯示最多 60 秒的數據，或者測試時間（如果小於 60 秒）
-        start_time = max(0, current_time - window_size * 0.2)  # 顯示當前時間前 20% 的數據
-        end_time = min(test_time, start_time + window_size)  # 顯示最多 window_size 秒的數據
-        
-        # 設置 X 軸範圍
-        self.graph_view.plot_widget.setXRange(start_time, end_time)
+        # 只標記圖表需要重繪，由定時器合併後重繪
+        self._request_graph_update()
+    
+    def summary(self, series="default"):
+        """返回數據系列的統計摘要，全部由 NumPy 在調用時計算"""
+        data = self.series_data[series]
+        y = data["y"][:data["n"]]
+        if not y.size:
+            return None
+        p50, p90, p99 = np.quantile(y, [0.5, 0.9, 0.99])
+        return {
+            "count": int(y.size),
+            "mean": float(y.mean()),
+            "max": float(y.max()),
+            "min": float(y.min()),
+            "p50": float(p50),
+            "p90": float(p90),
+            "p99": float(p99)
+        }
     
     def test_graph(self):
         """測試圖表顯示"""
         # 清除之前的數據
-        self.series_data = {
-            "default": {"x": [], "y": []},
-            "sent": {"x": [], "y": []},
-            "received": {"x": [], "y": []}
-        }
-        self.graph_view.clear_graph()
-        
-        # 清除之前的統計數據
-        self.stats = {
-            "default": {"max": 0, "min": float('inf'), "sum": 0, "count": 0},
-            "sent": {"max": 0, "min": float('inf'), "sum": 0, "count": 0},
-            "received": {"max": 0, "min": float('inf'), "sum": 0, "count": 0}
-        }
+        self.reset_series_data()
+        self.graph_view.reset_data()
         
         # 設置測試時間
         test_time = self.time_input.value()
@@ -642,25 +838,36 @@ class IperfGUI(QMainWindow):
         # 生成更有變化的測試數據
         base_value = 100  # 基準帶寬值
         
+        # 一次性生成全部測試數據並寫入預分配的緩衝區，定時器只負責推進顯示位置
+        rng = np.random.default_rng()
+        n_points = test_time + 1
+        test_values = {"default": base_value + rng.uniform(-20, 30, n_points)}
+        
+        # 如果啟用雙向測試，添加發送和接收數據
+        if self.bidirectional_check.isChecked():
+            test_values["sent"] = base_value * 0.7 + rng.uniform(-15, 25, n_points)
+            test_values["received"] = base_value * 1.3 + rng.uniform(-25, 35, n_points)
+        
+        for series, values in test_values.items():
+            data = self.series_data[series]
+            if data["x"].size < n_points:
+                data["x"] = np.empty(n_points, dtype=np.float32)
+                data["y"] = np.empty(n_points, dtype=np.float32)
+            data["x"][:n_points] = np.arange(n_points)
+            data["y"][:n_points] = values
+        
         # 創建一個定時器來模擬數據點的逐步添加
         self.test_timer = QTimer()
         self.test_current_time = 0
         
         def add_test_data_point():
-            if self.test_current_time <= test_time:
-                # 默認系列 - 隨機波動的帶寬
-                bandwidth = base_value + random.uniform(-20, 30)
-                self.add_data_point(self.test_current_time, bandwidth)
-                
-                # 如果啟用雙向測試，添加發送和接收數據
-                if self.bidirectional_check.isChecked():
-                    sent_bw = base_value * 0.7 + random.uniform(-15, 25)
-                    recv_bw = base_value * 1.3 + random.uniform(-25, 35)
-                    self.add_data_point(self.test_current_time, sent_bw, series="sent")
-                    self.add_data_point(self.test_current_time, recv_bw, series="received")
-                
-                # 更新圖表
-                self.update_graph()
+            i = self.test_current_time
+            if i <= test_time:
+                # 每次多顯示一個已生成的數據點
+                for series in test_values:
+                    self.series_data[series]["n"] = i + 1
+                    self._series_index[series][i * 100] = i
+                self._request_graph_update()
                 
                 # 增加時間
                 self.test_current_time += 1
@@ -673,7 +880,7 @@ class IperfGUI(QMainWindow):
         self.test_timer.timeout.connect(add_test_data_point)
         # 設置間隔為 200 毫秒，使動畫更流暢
         self.test_timer.setInterval(200)
-        # 啟動定時器
+        # 啟動定時器，每個數據點都會請求一次合併後的重繪
         self.test_timer.start()
         
         # 切換到圖表選項卡
@@ -698,18 +905,22 @@ class IperfGUI(QMainWindow):
             return
         
         # 清除之前的結果
+        self._ping_out_buf.clear()
         self.ping_output.clear()
-        self.ping_x_data = []
-        self.ping_y_data = []
-        self.ping_graph_view.clear_graph()
-        self.ping_start_time = time.time()
+        self._ping_last_xrange = None
+        self._pending_pings.clear()
+        self._ping_graph_timer.stop()
+        self.ping_graph_view.reset_data()
+        self.ping_start_time = time.perf_counter()
         
-        # 創建並啟動 ping 工作線程
+        # 創建 ping 任務並交給線程池運行
         self.ping_worker = PingWorker(host)
-        self.ping_worker.output_received.connect(self.process_ping_output)
-        self.ping_worker.ping_result.connect(self.add_ping_data_point)
-        self.ping_worker.finished.connect(self.ping_finished)
-        self.ping_worker.start()
+        self.ping_worker.signals.output_received.connect(self.process_ping_output)
+        self.ping_worker.signals.ping_result.connect(self.add_ping_data_point)
+        # 綁定發出信號的任務：停止後立即重新開始時，舊任務稍後才結束，不能清除新任務
+        worker = self.ping_worker
+        worker.signals.finished.connect(lambda: self.ping_finished(worker))
+        self.thread_pool.start(self.ping_worker)
         
         # 更新 UI
         self.ping_button.setText(self.lang.get("stop_ping", "Stop Ping"))
@@ -722,74 +933,81 @@ class IperfGUI(QMainWindow):
 
     def stop_ping(self):
         """停止 ping"""
-        if self.ping_worker and self.ping_worker.isRunning():
+        if self.ping_worker:
             self.ping_worker.stop()
             self.ping_button.setText(self.lang.get("start_ping", "Start Ping"))
             self.ping_running = False
 
-    def ping_finished(self):
-        """ping 完成後的處理"""
+    def ping_finished(self, worker):
+        """ping 完成後的處理，忽略已被新任務取代的舊任務"""
+        if worker is not self.ping_worker:
+            return
+        self.ping_worker = None
         self.ping_button.setText(self.lang.get("start_ping", "Start Ping"))
         self.ping_running = False
 
-    def process_ping_output(self, line):
-        """處理 ping 輸出"""
-        self.ping_output.append(line)
-        
-        # 調試輸出 - 檢查是否包含時間信息
-        if "時間=" in line or "time=" in line:
-            print(f"Found time info in line: {line}")
-            
-            # 嘗試使用不同的正則表達式模式
-            import re
-            # 繁體中文 Windows
-            match1 = re.search(r"時間=(\d+)ms", line)
-            # 英文 Windows/Linux
-            match2 = re.search(r"time[=<](\d+)ms", line)
-            # Linux/Mac
-            match3 = re.search(r"time=([\d\.]+) ms", line)
-            
-            if match1:
-                print(f"Matched pattern 1: {match1.group(1)}")
-            elif match2:
-                print(f"Matched pattern 2: {match2.group(1)}")
-            elif match3:
-                print(f"Matched pattern 3: {match3.group(1)}")
-            else:
-                print(f"No pattern matched for line: {line}")
+    def process_ping_output(self, lines):
+        """處理一批 ping 輸出行"""
+        self._ping_out_buf.extend(lines)
+        if not self.output_flush_timer.isActive():
+            self.output_flush_timer.start()
+        
+        # 調試輸出 - 只在啟用 DEBUG 時才檢查時間信息
+        if logger.isEnabledFor(logging.DEBUG):
+            for line in lines:
+                match = _PING_PATTERN_ANY.search(line)
+                if match:
+                    logger.debug("Matched ping time: %s", match.group(1))
+                else:
+                    logger.debug("No pattern matched for line: %s", line)
 
     def add_ping_data_point(self, ping_time):
         """添加 ping 數據點到圖表"""
-        # 獲取當前時間點（相對於開始時間）
-        if not self.ping_x_data:
+        # 獲取當前時間點（相對於開始時間），第一個數據點固定為 0
+        if not self._pending_pings and not self.ping_graph_view.series_length():
             x = 0
         else:
-            x = time.time() - self.ping_start_time
-        
-        self.ping_x_data.append(x)
-        self.ping_y_data.append(ping_time)
+            x = time.perf_counter() - self.ping_start_time
         
         # 調試輸出
-        print(f"Adding ping data point: time={x}, latency={ping_time}")
+        logger.debug("Adding ping data point: time=%s, latency=%s", x, ping_time)
         
-        # 限制數據點數量，防止內存溢出和提高性能
-        max_points = 300  # 增加最大點數
-        if len(self.ping_x_data) > max_points:
-            self.ping_x_data = self.ping_x_data[-max_points:]
-            self.ping_y_data = self.ping_y_data[-max_points:]
+        # 只記錄數據點，由定時器合併後統一更新圖表
+        self._pending_pings.append((x, ping_time))
+        if not self._ping_graph_timer.isActive():
+            self._ping_graph_timer.start()
+    
+    def _flush_ping_graph(self):
+        """把累積的 ping 數據點一次性寫入圖表"""
+        pending = self._pending_pings
+        if not pending:
+            return
         
-        # 更新圖表
-        self.ping_graph_view.update_graph(self.ping_y_data, x_data=self.ping_x_data)
+        # 圖表不可見時只保留數據，重新顯示時再繪製；
+        # 環形緩衝區只保留最近的點，更早的點不必再保留
+        graph = self.ping_graph_view
+        if not graph.isVisible():
+            del pending[:-self.ping_max_points]
+            return
+        self._pending_pings = []
+        
+        # 數據點逐個追加到環形緩衝區，曲線數據只寫入一次
+        for x, ping_time in pending:
+            graph.update_graph(ping_time, x_value=x, max_points=self.ping_max_points)
+        graph.flush()
         
         # 設置 X 軸範圍為最近 60 秒的數據
-        if len(self.ping_x_data) > 1:
-            current_time = self.ping_x_data[-1]
-            start_time = max(0, current_time - self.ping_display_window)
-            self.ping_graph_view.plot_widget.setXRange(start_time, current_time)
-        
-        # 強制更新圖表
-        self.ping_graph_view.repaint()
-        QApplication.processEvents()  # 強制處理事件，確保圖表更新
+        # 窗口實際移動時才設置，且不立即更新視圖，與下面的重繪請求合併
+        x = pending[-1][0]
+        if graph.series_length() > 1:
+            start_time = max(0, x - self.ping_display_window)
+            last = self._ping_last_xrange
+            if last is None or abs(x - last[1]) > 0.05 or abs(start_time - last[0]) > 0.05:
+                self._ping_last_xrange = (start_time, x)
+                graph.plot_widget.setXRange(start_time, x, padding=0, update=False)
+        
+        # 請求重繪，由 Qt 合併連續的繪製請求
+        graph.update()
 
     def save_results(self):
         """保存测试结果"""
@@ -804,159 +1022,93 @@ class IperfGUI(QMainWindow):
         
         if filename:
             try:
-                with open(filename, 'w', encoding='utf-8') as f:
-                    f.write(self.output_text.toPlainText())
+                self.flush_output()
+                # 逐個文本塊寫入，不必先把整個文檔複製成一個字符串
+                doc = self.output_text.document()
+                with open(filename, 'w', encoding='utf-8', buffering=1 << 20) as f:
+                    block = doc.begin()
+                    while block.isValid():
+                        f.write(block.text())
+                        block = block.next()
+                        if block.isValid():
+                            f.write('\n')
                 self.statusBar().showMessage(self.lang["results_saved"])
             except Exception as e:
                 QMessageBox.critical(self, self.lang["error"], f"{str(e)}")
 
     def clear_results(self):
         """清除测试结果"""
+        self._out_buf.clear()
         self.output_text.clear()
-        self.series_data = {
-            "default": {"x": [], "y": []},
-            "sent": {"x": [], "y": []},
-            "received": {"x": [], "y": []}
-        }
-        self.stats = {
-            "default": {"max": 0, "min": float('inf'), "sum": 0, "count": 0},
-            "sent": {"max": 0, "min": float('inf'), "sum": 0, "count": 0},
-            "received": {"max": 0, "min": float('inf'), "sum": 0, "count": 0}
-        }
-        self.graph_view.clear_graph()
+        self.reset_series_data()
+        self.graph_view.reset_data()
         self.statusBar().showMessage(self.lang["results_cleared"])
 
-    def update_graph(self):
+    def _request_graph_update(self):
+        """標記圖表需要重繪，定時器未啟動時啟動它"""
+        self._graph_dirty = True
+        if not self._graph_timer.isActive():
+            self._graph_timer.start()
+    
+    def _flush_graph(self):
         """更新圖表顯示"""
-        print(f"更新圖表，時間：{time.time()}")
+        # 沒有新數據時不重繪；圖表不可見時保留標記，重新顯示時再重繪
+        if not self._graph_dirty or not self.graph_view.isVisible():
+            return
+        self._graph_dirty = False
+        
+        logger.debug("更新圖表，時間：%s", time.time())
         
         try:
-            # 清除現有曲線，但保留設置
-            self.graph_view.clear_graph(keep_settings=True)
+            # 曲線、統計標籤和平均線都只創建一次，之後只更新數據和位置
+            for series, color, y_frac in _SERIES_SPEC:
+                self._update_one_series(series, color, y_frac)
             
-            # 添加各個數據系列
-            # 默認數據系列（單向測試）
-            if self.series_data["default"]["x"] and self.series_data["default"]["y"]:
-                self.graph_view.add_series(
-                    self.series_data["default"]["x"],
-                    self.series_data["default"]["y"],
-                    name=self.lang.get("bandwidth", "頻寬"),
-                    color=(0, 0, 255)
-                )
-                
-                # 添加統計信息
-                if self.stats["default"]["count"] > 0:
-                    avg = self.stats["default"]["sum"] / self.stats["default"]["count"]
-                    max_val = self.stats["default"]["max"]
-                    min_val = self.stats["default"]["min"] if self.stats["default"]["min"] != float('inf') else 0
-                    
-                    # 添加平均值、最大值、最小值標籤
-                    stats_text = f"{self.lang.get('average', '平均')}: {avg:.2f} Mbps\n"
-                    stats_text += f"{self.lang.get('maximum', '最大')}: {max_val:.2f} Mbps\n"
-                    stats_text += f"{self.lang.get('minimum', '最小')}: {min_val:.2f} Mbps"
-                    
-                    # 計算文本位置 - 放在右上角
-                    x_pos = max(self.series_data["default"]["x"]) * 0.7 if self.series_data["default"]["x"] else 0
-                    y_pos = max(self.series_data["default"]["y"]) * 0.9 if self.series_data["default"]["y"] else 0
-                    
-                    self.graph_view.add_text_item(
-                        stats_text,
-                        x=x_pos,
-                        y=y_pos,
-                        color=(0, 0, 255)
-                    )
-                    
-                    # 添加水平線表示平均值
-                    self.graph_view.add_horizontal_line(
-                        avg, 
-                        name=self.lang.get('average', '平均'), 
-                        color=(0, 0, 255, 100)
-                    )
+            # 本次重繪已經由定時器限制頻率，立即寫入曲線數據
+            self.graph_view.flush()
             
-            # 發送數據系列（雙向測試）
-            if self.series_data["sent"]["x"] and self.series_data["sent"]["y"]:
-                self.graph_view.add_series(
-                    self.series_data["sent"]["x"],
-                    self.series_data["sent"]["y"],
-                    name=self.lang.get("bandwidth_sent", "上傳"),
-                    color=(255, 0, 0)
-                )
-                
-                # 添加統計信息
-                if self.stats["sent"]["count"] > 0:
-                    avg = self.stats["sent"]["sum"] / self.stats["sent"]["count"]
-                    max_val = self.stats["sent"]["max"]
-                    min_val = self.stats["sent"]["min"] if self.stats["sent"]["min"] != float('inf') else 0
-                    
-                    # 添加平均值、最大值、最小值標籤
-                    stats_text = f"{self.lang.get('upload_average', '上傳平均')}: {avg:.2f} Mbps\n"
-                    stats_text += f"{self.lang.get('maximum', '最大')}: {max_val:.2f} Mbps\n"
-                    stats_text += f"{self.lang.get('minimum', '最小')}: {min_val:.2f} Mbps"
-                    
-                    # 計算文本位置 - 放在右上角但低於默認系列
-                    x_pos = max(self.series_data["sent"]["x"]) * 0.7 if self.series_data["sent"]["x"] else 0
-                    y_pos = max(self.series_data["sent"]["y"]) * 0.7 if self.series_data["sent"]["y"] else 0
-                    
-                    self.graph_view.add_text_item(
-                        stats_text,
-                        x=x_pos,
-                        y=y_pos,
-                        color=(255, 0, 0)
-                    )
-                    
-                    # 添加水平線表示平均值
-                    self.graph_view.add_horizontal_line(
-                        avg, 
-                        name=self.lang.get('upload_average', '上傳平均'), 
-                        color=(255, 0, 0, 100)
-                    )
-            
-            # 接收數據系列（雙向測試）
-            if self.series_data["received"]["x"] and self.series_data["received"]["y"]:
-                self.graph_view.add_series(
-                    self.series_data["received"]["x"],
-                    self.series_data["received"]["y"],
-                    name=self.lang.get("bandwidth_received", "下載"),
-                    color=(0, 255, 0)
-                )
-                
-                # 添加統計信息
-                if self.stats["received"]["count"] > 0:
-                    avg = self.stats["received"]["sum"] / self.stats["received"]["count"]
-                    max_val = self.stats["received"]["max"]
-                    min_val = self.stats["received"]["min"] if self.stats["received"]["min"] != float('inf') else 0
-                    
-                    # 添加平均值、最大值、最小值標籤
-                    stats_text = f"{self.lang.get('download_average', '下載平均')}: {avg:.2f} Mbps\n"
-                    stats_text += f"{self.lang.get('maximum', '最大')}: {max_val:.2f} Mbps\n"
-                    stats_text += f"{self.lang.get('minimum', '最小')}: {min_val:.2f} Mbps"
-                    
-                    # 計算文本位置 - 放在右上角但低於其他系列
-                    x_pos = max(self.series_data["received"]["x"]) * 0.7 if self.series_data["received"]["x"] else 0
-                    y_pos = max(self.series_data["received"]["y"]) * 0.5 if self.series_data["received"]["y"] else 0
-                    
-                    self.graph_view.add_text_item(
-                        stats_text,
-                        x=x_pos,
-                        y=y_pos,
-                        color=(0, 255, 0)
-                    )
-                    
-                    # 添加水平線表示平均值
-                    self.graph_view.add_horizontal_line(
-                        avg, 
-                        name=self.lang.get('download_average', '下載平均'), 
-                        color=(0, 255, 0, 100)
-                    )
+            # 調整 X 軸範圍，顯示最新數據附近的範圍
+            # 各系列按時間排序，最後一個數據點就是該系列的最新時間
+            last = max((float(d["x"][d["n"] - 1]) for d in self.series_data.values() if d["n"]), default=0)
+            test_time = self.time_input.value()
+            window_size = min(60, test_time)  # 顯示最多 60 秒的數據，或者測試時間（如果小於 60 秒）
+            start_time = max(0, last - window_size * 0.8)  # 最新數據位於窗口的 80% 處
+            self.graph_view.plot_widget.setXRange(start_time, start_time + window_size)
             
-            # 強制更新圖表
-            self.graph_view.repaint()
-            QApplication.processEvents()  # 強制處理事件，確保圖表更新
-        except Exception as e:
-            print(f"更新圖表時出錯: {e}")
+            # 請求重繪，由 Qt 合併連續的繪製請求
+            self.graph_view.update()
+        except Exception:
+            logger.exception("更新圖表時出錯")
+    
+    def _update_one_series(self, series, color, y_frac):
+        """更新一個數據系列的曲線、統計標籤和平均線，空系列直接跳過"""
+        data = self.series_data[series]
+        n = data["n"]
+        if not n:
+            return
+        
+        name, avg_name = self._series_labels[series]
+        y = data["y"][:n]
+        self.graph_view.add_series(data["x"][:n], y, name=name, color=color, key=series)
+        
+        # 添加平均值、最大值、最小值標籤
+        # 統計數據直接在連續的緩衝區視圖上用 NumPy 計算，每次重繪只需三次 C 循環，
+        # 更新已有時間點的數值後統計結果也始終準確
+        avg = float(y.mean())
+        max_val = float(y.max())
+        stats_text = self._stats_templates[series].format(avg, max_val, float(y.min()))
+        
+        # 計算文本位置 - 放在右上角
+        # 數據按時間排序，最後一個點的時間最大
+        self.graph_view.add_text_item(stats_text, x=float(data["x"][n - 1]) * 0.7, y=max_val * y_frac,
+                                      color=color, key=series)
+        
+        # 添加水平線表示平均值
+        self.graph_view.add_horizontal_line(avg, name=avg_name, color=color + (100,), key=series)
 
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING)
     app = QApplication(sys.argv)
     gui = IperfGUI()
     gui.show()
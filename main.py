@@ -1,6 +1,7 @@
 import sys
 import os
 import argparse
+import logging
 from PyQt5.QtWidgets import QApplication
 from PyQt5.QtCore import Qt
 from iperf_gui import IperfGUI
@@ -23,6 +24,9 @@ def main():
     # 解析命令行参数
     args = parse_args()
     
+    # 默认只输出警告及以上级别的日志
+    logging.basicConfig(level=logging.WARNING)
+    
     # 创建应用程序
     app = QApplication(sys.argv)
     app.setStyle('Fusion')  # 使用Fusion风格，在所有平台上看起来一致